@@ -0,0 +1,218 @@
+# Async HTTP service around the Python RAG chain in lib/utils.py. It accepts the
+# same JSON body as chatadv.php:
+#   {"message": "...", "previous_response_id": "..."}
+# and answers with {"previous_response_id": "...", "text": "..."}. Add
+# "stream": true to the body to get newline-delimited JSON chunks instead.
+# Passing a returned previous_response_id continues that conversation: the
+# last few turns are kept in lib/conversations.py and added to the prompt,
+# while retrieval still uses only the new question.
+#
+# Run from the repository root:
+#   python -m app.server --workers 4 --port 8080
+#
+# Each worker memory-maps the FAISS index vectors read-only, so all workers
+# share one copy of them through the OS page cache (the docstore with the chunk
+# text is still loaded by each worker). When vstore/shards exists (built by
+# scripts/02_build_sharded_vectorstore.py) questions are routed to the matching
+# category shards instead of the single vstore/webpage_vectorstore index. Set
+# CHATADV_STUB_LLM=1 to swap the OpenAI chat model and query embeddings for
+# local fakes when load testing.
+
+import os
+import re
+import json
+import asyncio
+import uuid
+import argparse
+from pathlib import Path
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from langchain_openai import OpenAIEmbeddings
+
+from lib.conversations import ConversationStore
+from lib.utils import load_environment, load_mmap_vectorstore, read_mmap_index, setup_rag_chain
+from lib.shards import ShardedRetriever, load_sharded_vectorstores, shard_folders
+
+
+VECTORSTORE_PATH = os.environ.get('CHATADV_VECTORSTORE', 'vstore/webpage_vectorstore')
+SHARDS_PATH = os.environ.get('CHATADV_SHARDS', 'vstore/shards')
+
+STUB_ANSWER = (
+    "<quotes>\n[1] Prerequisite: ISA 245 or CSE 385.\n</quotes>\n"
+    "<answer>\nThis is a stub answer generated for load testing [1].\n</answer>"
+)
+
+# Earlier turns added to the prompt of a follow-up question, and how much of
+# each answer
+HISTORY_TURNS = 3
+HISTORY_ANSWER_CHARS = 1000
+
+ANSWER_TAGS = re.compile(r'<answer>(.*?)</answer>', re.DOTALL)
+
+
+def use_stub_llm():
+    return os.environ.get('CHATADV_STUB_LLM', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def use_shards():
+    if shard_folders(SHARDS_PATH):
+        return True
+    if os.path.isdir(SHARDS_PATH):
+        print(f"No built shards under {SHARDS_PATH}, using {VECTORSTORE_PATH}")
+    return False
+
+
+def build_retriever(embeddings, sharded):
+    if sharded:
+        shards = load_sharded_vectorstores(SHARDS_PATH, embeddings=embeddings)
+        return ShardedRetriever(shards=shards, embeddings=embeddings)
+
+    return load_mmap_vectorstore(VECTORSTORE_PATH, embeddings=embeddings).as_retriever()
+
+
+def build_chain():
+    load_environment()
+    sharded = use_shards()
+
+    if use_stub_llm():
+        # Size the fake query embeddings to match the stored vectors
+        folder = shard_folders(SHARDS_PATH)[0] if sharded else Path(VECTORSTORE_PATH)
+        embeddings = DeterministicFakeEmbedding(size=read_mmap_index(folder / 'index.faiss').d)
+        llm = FakeListChatModel(
+            responses=[STUB_ANSWER],
+            sleep=float(os.environ.get('CHATADV_STUB_LLM_DELAY', '0.005'))
+        )
+        return setup_rag_chain(retriever=build_retriever(embeddings, sharded), llm=llm)
+
+    embeddings = OpenAIEmbeddings(model='text-embedding-3-small')
+    return setup_rag_chain(retriever=build_retriever(embeddings, sharded))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Runs once per worker process
+    app.state.chain = build_chain()
+    app.state.conversations = ConversationStore()
+    yield
+
+
+app = FastAPI(title="ChatAdv", lifespan=lifespan)
+
+
+def json_error(status, message):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+def new_response_id():
+    return f"chatadv_{uuid.uuid4().hex}"
+
+
+def extract_answer(text):
+    """Return the text inside <answer></answer>, or all of it if the tags are missing."""
+    match = ANSWER_TAGS.search(text)
+    return (match.group(1) if match else text).strip()
+
+
+def format_history(turns):
+    if not turns:
+        return ""
+
+    lines = ["Earlier in this conversation:"]
+    for question, answer in turns:
+        lines.append(f"Student: {question}")
+        lines.append(f"ChatAdv: {answer[:HISTORY_ANSWER_CHARS]}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_answer(chain, conversations, chain_input, previous_response_id, response_id):
+    parts = []
+    try:
+        async for chunk in chain.astream(chain_input):
+            delta = chunk.get("answer")
+            if delta:
+                parts.append(delta)
+                yield json.dumps({"delta": delta}, ensure_ascii=False) + "\n"
+    except Exception as e:
+        yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+        return
+
+    answer = "".join(parts)
+    await asyncio.to_thread(
+        conversations.add, response_id, previous_response_id, chain_input["question"], extract_answer(answer)
+    )
+
+    yield json.dumps(
+        {"previous_response_id": response_id, "text": answer},
+        ensure_ascii=False
+    ) + "\n"
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.post("/chatadv")
+async def chatadv(request: Request):
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+
+    if not isinstance(body, dict):
+        return json_error(400, "Send JSON body like {\"message\":\"...\",\"previous_response_id\":\"...\"}")
+
+    user_message = body.get("message")
+    previous_response_id = body.get("previous_response_id")
+
+    if not isinstance(user_message, str) or user_message.strip() == "":
+        return json_error(400, "Field 'message' is required and must be a non-empty string.")
+    if previous_response_id is not None and not isinstance(previous_response_id, str):
+        return json_error(400, "Field 'previous_response_id' must be a string if provided.")
+
+    chain = request.app.state.chain
+    conversations = request.app.state.conversations
+
+    # Multi-turn continuity
+    turns = []
+    if previous_response_id:
+        turns = await asyncio.to_thread(conversations.history, previous_response_id, HISTORY_TURNS)
+        if not turns:
+            return json_error(400, f"Unknown previous_response_id '{previous_response_id}'.")
+    else:
+        previous_response_id = None
+
+    chain_input = {"question": user_message, "history": format_history(turns)}
+    response_id = new_response_id()
+
+    if body.get("stream"):
+        return StreamingResponse(
+            stream_answer(chain, conversations, chain_input, previous_response_id, response_id),
+            media_type="application/x-ndjson"
+        )
+
+    try:
+        result = await chain.ainvoke(chain_input)
+    except Exception as e:
+        return json_error(500, str(e))
+
+    await asyncio.to_thread(
+        conversations.add, response_id, previous_response_id, user_message, extract_answer(result["answer"])
+    )
+
+    return {"previous_response_id": response_id, "text": result["answer"]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the ChatAdv RAG chain over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    uvicorn.run("app.server:app", host=args.host, port=args.port, workers=args.workers)
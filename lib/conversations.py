@@ -0,0 +1,78 @@
+# Libraries
+# ---------
+import os
+import time
+import sqlite3
+from pathlib import Path
+
+
+# Conversation history shared by all server workers
+# ------------------------------------------------------------------------------
+# Each answered turn is stored under its response id along with the id of the
+# turn it followed, so a previous_response_id can be walked back into the
+# conversation so far. The SQLite file (WAL mode) is shared by every worker
+# process, so a follow-up can land on any of them. Turns older than the TTL
+# are deleted at startup and then at most once per PRUNE_INTERVAL seconds.
+
+DEFAULT_HISTORY_DB = os.environ.get('CHATADV_HISTORY_DB', 'data/conversations.sqlite3')
+DEFAULT_TTL_HOURS = float(os.environ.get('CHATADV_HISTORY_TTL_HOURS', '24'))
+PRUNE_INTERVAL = 300
+
+
+class ConversationStore:
+    def __init__(self, path=DEFAULT_HISTORY_DB, ttl_hours=DEFAULT_TTL_HOURS):
+        self.path = Path(path)
+        self.ttl_hours = ttl_hours
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._execute("PRAGMA journal_mode=WAL")
+        self._execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " response_id TEXT PRIMARY KEY,"
+            " previous_response_id TEXT,"
+            " question TEXT NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " created_at TEXT DEFAULT CURRENT_TIMESTAMP"
+            ")"
+        )
+        self._execute("CREATE INDEX IF NOT EXISTS turns_created_at ON turns (created_at)")
+        self.prune()
+
+    def _execute(self, sql, params=()):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def add(self, response_id, previous_response_id, question, answer):
+        self._execute(
+            "INSERT INTO turns (response_id, previous_response_id, question, answer)"
+            " VALUES (?, ?, ?, ?)",
+            (response_id, previous_response_id, question, answer)
+        )
+        if time.monotonic() - self._last_prune > PRUNE_INTERVAL:
+            self.prune()
+
+    def prune(self):
+        """Delete turns older than the TTL."""
+        self._execute(
+            "DELETE FROM turns WHERE created_at < datetime('now', ?)",
+            (f"-{self.ttl_hours} hours",)
+        )
+        self._last_prune = time.monotonic()
+
+    def history(self, response_id, max_turns=3):
+        """Return up to `max_turns` (question, answer) pairs ending at `response_id`, oldest first."""
+        turns = []
+        while response_id and len(turns) < max_turns:
+            rows = self._execute(
+                "SELECT previous_response_id, question, answer FROM turns WHERE response_id = ?",
+                (response_id,)
+            )
+            if not rows:
+                break
+            response_id, question, answer = rows[0]
+            turns.append((question, answer))
+        return turns[::-1]
@@ -0,0 +1,138 @@
+# Libraries
+# ---------
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+
+import requests
+
+
+# On-disk HTTP fetch cache
+# ------------------------------------------------------------------------------
+# Bodies are stored once under objects/<sha256 of body>, and index.json maps
+# each URL to the hash of its latest body plus the ETag / Last-Modified headers
+# needed to revalidate it. Set FETCH_CACHE_OFFLINE=1 to serve everything from
+# the cache without touching the network.
+
+DEFAULT_CACHE_DIR = os.environ.get('FETCH_CACHE_DIR', 'data/fetch_cache')
+
+
+class CacheMiss(LookupError):
+    """Raised when a URL is requested offline but was never cached."""
+
+
+def offline_mode():
+    return os.environ.get('FETCH_CACHE_OFFLINE', '').strip().lower() in ('1', 'true', 'yes')
+
+
+class FetchCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, *, offline=None, session=None, timeout=30):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / 'objects'
+        self.index_path = self.cache_dir / 'index.json'
+        self.offline = offline_mode() if offline is None else offline
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        if self.index_path.exists():
+            self.index = json.loads(self.index_path.read_text(encoding='utf-8'))
+        else:
+            self.index = {}
+
+    def get(self, url):
+        """
+        Return the raw body of `url` as bytes.
+        Sends If-None-Match / If-Modified-Since when the URL is cached and
+        serves the stored body on a 304.
+        """
+        if self.offline:
+            return self.read(url)
+
+        entry = self.index.get(url)
+        if entry is not None and not self._object_path(entry['sha256']).exists():
+            # Index entry without its body: forget it and download afresh
+            del self.index[url]
+            self._save_index()
+            entry = None
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304:
+            if entry is None:
+                raise requests.HTTPError(
+                    f"304 Not Modified for {url}, which is not in the fetch cache",
+                    response=response
+                )
+            return self._read_object(entry['sha256'])
+
+        response.raise_for_status()
+
+        self.put(
+            url,
+            response.content,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            content_type=response.headers.get('Content-Type'),
+        )
+        return response.content
+
+    def read(self, url):
+        """Return the cached body of `url` without touching the network."""
+        entry = self.index.get(url)
+        if entry is None or not self._object_path(entry['sha256']).exists():
+            raise CacheMiss(f"{url} is not in the fetch cache ({self.cache_dir})")
+        return self._read_object(entry['sha256'])
+
+    def put(self, url, body, *, etag=None, last_modified=None, content_type=None):
+        """
+        Store `body` as the current content of `url`, e.g. HTML rendered by a
+        browser. Without an ETag / Last-Modified, a later get() downloads it in full.
+        """
+        self.index[url] = {
+            'sha256': self._write_object(body),
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': content_type,
+        }
+        self._save_index()
+
+    def urls(self):
+        return list(self.index)
+
+    def _object_path(self, sha256):
+        return self.objects_dir / sha256
+
+    def _read_object(self, sha256):
+        return self._object_path(sha256).read_bytes()
+
+    def _write_object(self, body):
+        sha256 = hashlib.sha256(body).hexdigest()
+        path = self._object_path(sha256)
+        if not path.exists():
+            self._atomic_write(path, body)
+        return sha256
+
+    def _save_index(self):
+        data = json.dumps(self.index, indent=2, sort_keys=True).encode('utf-8')
+        self._atomic_write(self.index_path, data)
+
+    def _atomic_write(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
@@ -0,0 +1,256 @@
+# Libraries
+# ---------
+import re
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from lib.utils import load_mmap_vectorstore
+
+
+# Source categories
+# ------------------------------------------------------------------------------
+# Each scraped page goes to exactly one shard, decided by its URL path and
+# page_title (data/scraped_urls_revised.csv). Rules are checked in order, and
+# anything unmatched lands in the "policies" shard.
+
+SHARDS = ['courses', 'programs', 'advising', 'admissions', 'policies']
+DEFAULT_SHARD = 'policies'
+
+SHARD_RULES = [
+    ('courses', [r'bulletin\.miamioh\.edu/courses-instruction/', r'/courselist/']),
+    ('programs', [
+        r'bulletin\.miamioh\.edu/(farmer-business|creative-arts|graduate-fields-study)/',
+        r'miamioh\.edu/fsb/student-resources/academic-advising/academics/',
+        r'miamioh\.edu/fsb/academics/',
+    ]),
+    ('advising', [r'miamioh\.edu/fsb/student-resources/academic-advising/', r'formstack\.com/']),
+    ('admissions', [
+        r'bulletin\.miamioh\.edu/admission-',
+        r'miamioh\.edu/fsb/admission/',
+        r'bulletin\.miamioh\.edu/graduate-school/',
+        r'miamioh\.edu/onestop/transfer-credit/',
+    ]),
+]
+
+# Bulletin course listings are titled like "Information Systems & Analytics (ISA)".
+# Only bulletin pages are matched on it: OneStop titles such as "Banner Waitlist
+# and Registration Override Request (ROR)" end the same way but are policies.
+COURSE_TITLE = re.compile(r'\([A-Z]{2,4}\)\s*$')
+
+
+def categorize(url, page_title=''):
+    url = url or ''
+    for shard, patterns in SHARD_RULES:
+        if any(re.search(p, url) for p in patterns):
+            return shard
+    if 'bulletin.miamioh.edu' in url and COURSE_TITLE.search(page_title or ''):
+        return 'courses'
+    return DEFAULT_SHARD
+
+
+# Query routing
+# ------------------------------------------------------------------------------
+# Keyword router: a question goes to every shard whose keywords it mentions, or
+# to all shards when none match. ShardedRetriever widens the search to the
+# remaining shards when the routed ones return nothing close enough. A keyword is listed under every shard that
+# holds pages answering it (e.g. registration is covered both by the FSB
+# advising pages and by the OneStop pages in "policies"); ROUTING_EXAMPLES
+# below checks this against real pages.
+
+# Course codes: any uppercase subject code, or a subject from the bulletin's
+# courses-instruction pages in any case ("isa 401"). Plain numbers such as
+# "120 hours" do not count.
+COURSE_CODE = re.compile(r'\b[A-Z]{2,4}\s?\d{3}[A-Z]?\b')
+SUBJECT_CODE = re.compile(
+    r'\b(acc|bus|cse|eco|esp|fin|isa|mgt|mkt|mth|sta)\s?\d{3}[a-z]?\b', re.IGNORECASE
+)
+
+ROUTES = {
+    'courses': [
+        r'\bprereqs?\b', r'\bprerequisites?\b', r'\bco-?requisites?\b',
+        r'\bcourse descriptions?\b', r'\bcredit hours?\b', r'\boffered\b',
+    ],
+    'programs': [
+        r'\bmajors?\b', r'\bminors?\b', r'\bco-?majors?\b', r'\bcertificates?\b',
+        r'\bconcentrations?\b', r'\bbsb\b', r'\bdegree requirements?\b',
+        r'\bprograms?\b', r'\bhonors\b', r'\bmaster', r'\bmba\b', r'\belectives?\b',
+    ],
+    'advising': [
+        r'\badvis(or|ors|ing)\b', r'\bappointments?\b', r'\bpetitions?\b',
+        r'\bforms?\b', r'\bchang(e|ing) (of|my) (majors?|programs?)\b', r'\bregist(er|ration)\b',
+        r'\bror\b', r'\boverride\b', r'\bwaitlist', r'\bcrn\b',
+    ],
+    'admissions': [
+        r'\badmi(ssions?|tted|t)\b', r'\bapply\b', r'\btransfer\b',
+        r'\bhigh school\b', r'\bprospective\b', r'\bincoming\b',
+        r'\bgraduate (programs?|school|students?|degrees?)\b',
+    ],
+    'policies': [
+        r'\bgpa\b', r'\bprobation\b', r'\bdrop(ping)?\b', r'\bwithdraw', r'\bcredit/no credit\b',
+        r'\bpass/fail\b', r'\brepeat', r'\bforgiveness\b', r'\bgraduat(e|ion)\b',
+        r'\btranscripts?\b', r"\bdeans?'?s? list\b", r'\bfinal exams?\b', r'\bcalendar\b',
+        r'\bholds?\b', r'\btuition\b', r'\bliberal education\b', r'\bintegrity\b',
+        r'\bexcess hours\b', r'\bcredit hours?\b', r'\baudit\b', r'\bdar\b',
+        r'\bregist(er|ration)\b', r'\bror\b', r'\boverride\b', r'\bwaitlist',
+        r'\bhonors\b', r'\bdiplomas?\b',
+    ],
+}
+
+
+def route_query(question, available=None):
+    """Return the shard names to search for `question`."""
+    available = list(available or SHARDS)
+    text = question.lower()
+
+    selected = [
+        shard for shard, patterns in ROUTES.items()
+        if any(re.search(p, text) for p in patterns)
+    ]
+    has_code = COURSE_CODE.search(question) or SUBJECT_CODE.search(question)
+    if has_code and 'courses' not in selected:
+        selected.append('courses')
+
+    selected = [shard for shard in available if shard in selected]
+    return selected or available
+
+
+# Routing checks
+# ------------------------------------------------------------------------------
+# (question, URL of the page that answers it, page_title, shard of that page).
+# check_routing() verifies that each page lands in the expected shard and that
+# the router searches that shard for the question.
+
+ROUTING_EXAMPLES = [
+    ("prereq for ISA 401",
+     "https://bulletin.miamioh.edu/courses-instruction/isa/",
+     "Information Systems & Analytics (ISA)", 'courses'),
+    ("What are the prerequisites for isa 401?",
+     "https://bulletin.miamioh.edu/courses-instruction/isa/",
+     "Information Systems & Analytics (ISA)", 'courses'),
+    ("What are the required courses for the Finance major?",
+     "https://bulletin.miamioh.edu/farmer-business/finance-bsb/",
+     "Finance- Bachelor of Science in Business", 'programs'),
+    ("What do I need for the Business Analytics minor?",
+     "https://miamioh.edu/fsb/student-resources/academic-advising/academics/minors-and-certificates/ba-minor.html",
+     "Business Analytics Minor", 'programs'),
+    ("How do I submit a ROR?",
+     "https://miamioh.edu/onestop/registration/courses/banner-waitlist-ror.html",
+     "Banner Waitlist and Registration Override Request (ROR)", 'policies'),
+    ("When can I register for classes?",
+     "https://miamioh.edu/fsb/student-resources/academic-advising/registration.html",
+     "Registration", 'advising'),
+    ("Can I take 20 credit hours this semester?",
+     "https://miamioh.edu/onestop/registration/courses/excess-hours.html",
+     "Request Permission to Take Excess Hours", 'policies'),
+    ("How do I make an appointment with my advisor?",
+     "https://miamioh.edu/fsb/student-resources/academic-advising/appointments.html",
+     "Appointments", 'advising'),
+    ("Can I take a class pass/fail?",
+     "https://miamioh.edu/onestop/registration/courses/credit-no-credit.html",
+     "Credit/No Credit Grading", 'policies'),
+    ("How do I apply for graduation?",
+     "https://miamioh.edu/onestop/academic-records/graduation-diplomas/index.html",
+     "Apply for Graduation", 'policies'),
+    ("What GPA do I need to get into FSB as a transfer student?",
+     "https://miamioh.edu/fsb/admission/transfer-students.html",
+     "Transfer Students", 'admissions'),
+    ("How do I get into the business honors program?",
+     "https://miamioh.edu/fsb/academics/business-honors-program/admission.html",
+     "Admission to Honors", 'programs'),
+    ("What are Latin honors requirements?",
+     "https://miamioh.edu/onestop/academic-records/graduation-diplomas/degree-honors-distinction.html",
+     "Degree Honors and Distinction", 'policies'),
+    ("How do I change my major to finance?",
+     "https://miamioh.formstack.com/forms/fsb_change_of_program",
+     "", 'advising'),
+    ("What are the graduate programs?",
+     "https://bulletin.miamioh.edu/graduate-school/",
+     "The Graduate School", 'admissions'),
+]
+
+# Questions that must not pull in the courses shard through a course-code match
+NON_COURSE_QUESTIONS = [
+    "Do I need 120 hours to graduate?",
+    "I have 100 done, can I apply for graduation?",
+]
+
+
+def check_routing(examples=ROUTING_EXAMPLES):
+    """Return a list of mismatches between categorize() and route_query()."""
+    problems = []
+    for question, url, page_title, shard in examples:
+        category = categorize(url, page_title)
+        if category != shard:
+            problems.append(f"{url} is categorized as '{category}', expected '{shard}'")
+        routed = route_query(question)
+        if shard not in routed:
+            problems.append(f"'{question}' routes to {routed}, which misses '{shard}'")
+
+    for question in NON_COURSE_QUESTIONS:
+        if 'courses' in route_query(question):
+            problems.append(f"'{question}' is routed to 'courses'")
+    return problems
+
+
+# Sharded retrieval
+# ------------------------------------------------------------------------------
+def shard_folders(root='vstore/shards'):
+    """Return the built shard folders under `root` (empty if there are none)."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    return [folder for folder in sorted(root.iterdir()) if (folder / 'index.faiss').exists()]
+
+
+def load_sharded_vectorstores(root='vstore/shards', embeddings=None):
+    """Memory-map every shard saved under `root` (one FAISS folder per shard)."""
+    return {
+        folder.name: load_mmap_vectorstore(folder, embeddings=embeddings)
+        for folder in shard_folders(root)
+    }
+
+
+class ShardedRetriever(BaseRetriever):
+    """
+    Embeds the query once, searches the shards picked by route_query in
+    parallel, and keeps the k closest chunks across them. If the closest
+    routed chunk is farther than `fallback_distance`, the other shards are
+    searched too, so a routing miss costs latency rather than recall.
+    """
+    shards: dict
+    embeddings: Embeddings
+    k: int = 4
+    # Squared L2 distance; for the unit-length OpenAI embeddings 1.2 is a
+    # cosine similarity of about 0.4
+    fallback_distance: float = 1.2
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        names = route_query(query, available=self.shards)
+        embedding = self.embeddings.embed_query(query)
+
+        def search(name):
+            return self.shards[name].similarity_search_with_score_by_vector(embedding, k=self.k)
+
+        def search_all(names):
+            if len(names) == 1:
+                return search(names[0])
+            with ThreadPoolExecutor(max_workers=len(names)) as pool:
+                return [hit for result in pool.map(search, names) for hit in result]
+
+        hits = search_all(names)
+
+        rest = [name for name in self.shards if name not in names]
+        if rest and (not hits or min(score for _, score in hits) > self.fallback_distance):
+            hits += search_all(rest)
+
+        # All shards share one embedding model and L2 index type, so the
+        # distances are comparable (lower is closer)
+        hits.sort(key=lambda hit: hit[1])
+        return [doc for doc, _ in hits[:self.k]]
@@ -2,19 +2,22 @@
 # ---------
 import os
 import pickle
+from operator import itemgetter
 from dotenv import load_dotenv, find_dotenv
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain.prompts import (
+from langchain_core.prompts import (
     ChatPromptTemplate,
     HumanMessagePromptTemplate,
     PromptTemplate
 )
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from langchain_community.vectorstores import FAISS
+import faiss
 from fpdf import FPDF
 import re
 import tempfile
+from pathlib import Path
 from datetime import datetime
 
 def load_environment():
@@ -30,6 +33,26 @@ def load_embeddings_and_vectorstore():
     )
     return embeddings_model, vectorstore
 
+def read_mmap_index(index_path):
+    return faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+
+def load_mmap_vectorstore(folder_path='vstore/webpage_vectorstore', embeddings=None, index_name='index'):
+    """
+    Load a FAISS store saved with FAISS.save_local, memory-mapping the flat
+    index's vectors read-only instead of copying them into the heap. Processes
+    that load the same folder share those pages through the OS page cache; the
+    docstore pickle (chunk text and metadata) is still loaded per process.
+    """
+    folder = Path(folder_path)
+    index = read_mmap_index(folder / f"{index_name}.faiss")
+    with open(folder / f"{index_name}.pkl", 'rb') as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    if embeddings is None:
+        embeddings = OpenAIEmbeddings(model='text-embedding-3-small')
+
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
 def load_docs():
     return pickle.load(open('data/website_data.pkl', 'rb'))
 
@@ -38,14 +61,17 @@ def format_docs(docs):
         docs = load_docs()
     return "\n\n".join(doc.page_content for doc in docs)
 
-def setup_rag_chain():
-    _, vectorstore = load_embeddings_and_vectorstore()
-    retriever = vectorstore.as_retriever()
+def setup_rag_chain(vectorstore=None, llm=None, retriever=None):
+    if retriever is None:
+        if vectorstore is None:
+            _, vectorstore = load_embeddings_and_vectorstore()
+        retriever = vectorstore.as_retriever()
 
     system_temp = (
       "You are a friendly chatbot designed to assist Farmer School of Business (FSB) students with their advising questions. "
       "You have access to documents containing information about FSB policies and procedures. Your goal is to answer students' questions using these documents.\n\n"
       
+      "{history}"
       "Question: {question}\n\n"
       "Context: {context}\n\n"
    
@@ -115,18 +141,19 @@ def setup_rag_chain():
   )
 
     prompt = ChatPromptTemplate(
-        input_variables=['context', 'question'],
+        input_variables=['context', 'history', 'question'],
         messages=[
             HumanMessagePromptTemplate(
                 prompt=PromptTemplate(
-                    input_variables=['context', 'question'],
+                    input_variables=['context', 'history', 'question'],
                     template=system_temp
                 )
             )
         ]
     )
 
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
+    if llm is None:
+        llm = ChatOpenAI(model="gpt-4o", temperature=0)
 
     rag_chain_from_docs = (
         RunnablePassthrough.assign(context=(lambda x: format_docs(x["context"])))
@@ -135,8 +162,18 @@ def setup_rag_chain():
         | StrOutputParser()
     )
 
-    return RunnableParallel(
-        {"context": retriever, "question": RunnablePassthrough()}
+    # Accepts a question string, or {"question": ..., "history": ...} where the
+    # history is already formatted for the prompt. Retrieval only sees the question.
+    as_input = RunnableLambda(
+        lambda x: x if isinstance(x, dict) else {"question": x, "history": ""}
+    )
+
+    return as_input | RunnableParallel(
+        {
+            "context": itemgetter("question") | retriever,
+            "question": itemgetter("question"),
+            "history": itemgetter("history"),
+        }
     ).assign(answer=rag_chain_from_docs)
 
 # PDF generation functions
@@ -1,17 +1,28 @@
 # This script scrapes the contents of the URLs provided in the Google Doc and 
 # the URLs from the Farmer School of Business Bulletin. The contents are saved
 # in multiple pickle files for future use.
-
+#
+# Every page goes through the on-disk fetch cache in lib/fetch_cache.py, so a
+# re-run only downloads pages whose ETag / Last-Modified changed. Run with
+# FETCH_CACHE_OFFLINE=1 to redo the parsing and extraction entirely from the
+# cache (no network access, and the OpenAI upload is skipped). Pages that are
+# rendered client-side (see RENDERED_URL_PATTERNS) are rendered in a headless
+# browser on online runs and the rendered HTML is cached as well.
+
+import io
 import os
+import sys
 import time
+import pickle
 import random
-import requests
 import tempfile
 from pathlib import Path
 
 import pandas as pd
 
-from langchain_community.document_loaders import SeleniumURLLoader
+from langchain_core.documents import Document
+from selenium import webdriver
+from unstructured.partition.html import partition_html
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
@@ -24,6 +35,11 @@ from openai import (
     RateLimitError,
 )
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from lib.fetch_cache import FetchCache
+
+cache = FetchCache()
+
 
 # Bulletin URLs for the Farmer School of Business
 # ------------------------------------------------------------------------------
@@ -31,11 +47,11 @@ from openai import (
 # URL of the webpage
 url = "https://bulletin.miamioh.edu/farmer-business/"
 
-# Send a request to the webpage
-response = requests.get(url)
+# Send a (conditional) request to the webpage
+content = cache.get(url)
 
 # Parse the HTML content of the webpage
-soup = BeautifulSoup(response.content, 'html.parser')
+soup = BeautifulSoup(content, 'html.parser')
 
 # Find all 'a' tags within the specified CSS selector
 links = soup.select('#degreesandprogramstextcontainer > ul > li > a')
@@ -47,7 +63,7 @@ absolute_urls = [urljoin(url, link['href']) for link in links]
 # URLs from the CSV
 # ------------------
 urls_from_csv = (
-    pd.read_csv("https://raw.githubusercontent.com/fmegahed/chatadv/refs/heads/main/data/scraped_urls_revised.csv")
+    pd.read_csv(io.BytesIO(cache.get("https://raw.githubusercontent.com/fmegahed/chatadv/refs/heads/main/data/scraped_urls_revised.csv")))
     ['url']
     .tolist()
 )
@@ -57,11 +73,88 @@ urls_from_csv = (
 # ----------------------------------------
 urls = urls_from_csv + absolute_urls
 
+# A few CSV rows are page fragments rather than URLs
+urls = [u for u in urls if isinstance(u, str) and u.startswith("http")]
+
 
 # Scraping the Contents of the URLs
 # ------------------------------------------------------------------------------
-loader = SeleniumURLLoader(urls = urls)
-data = loader.load()
+# Every page is parsed from cached HTML with the same partitioning and metadata
+# fields that SeleniumURLLoader uses. Static pages are cached as fetched, so
+# their text can differ slightly from a browser render wherever a page fills
+# in content with JavaScript.
+#
+# The raw HTML of these pages is only an empty shell that JavaScript fills in,
+# so they are rendered in a headless browser and the rendered HTML is cached.
+RENDERED_URL_PATTERNS = [
+    "apps.miamioh.edu/courselist",
+    "formstack.com/",
+]
+
+def needs_browser(url):
+    return any(pattern in url for pattern in RENDERED_URL_PATTERNS)
+
+def render_into_cache(urls):
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    driver = webdriver.Chrome(options=options)
+
+    try:
+        for url in urls:
+            try:
+                driver.get(url)
+                cache.put(url, driver.page_source.encode("utf-8"), content_type="text/html; charset=utf-8")
+            except Exception as e:
+                # An earlier rendering stays in the cache and is used instead
+                print(f"Error rendering {url}, exception: {e}")
+    finally:
+        driver.quit()
+
+def load_document(url):
+    body = cache.read(url) if needs_browser(url) else cache.get(url)
+    html = body.decode("utf-8", errors="replace")
+    soup = BeautifulSoup(html, 'html.parser')
+
+    elements = partition_html(text=html)
+    text = "\n\n".join(str(el) for el in elements)
+
+    description = soup.find("meta", attrs={"name": "description"})
+    metadata = {
+        "source": url,
+        "title": soup.title.get_text(strip=True) if soup.title else "No title found.",
+        "description": description.get("content", "") if description else "No description found.",
+        "language": (soup.html or {}).get("lang", "No language found."),
+    }
+    return Document(page_content=text, metadata=metadata)
+
+rendered_urls = [url for url in urls if needs_browser(url)]
+if rendered_urls and not cache.offline:
+    render_into_cache(rendered_urls)
+
+data = []
+failed_urls = []
+for url in urls:
+    try:
+        data.append(load_document(url))
+    except Exception as e:
+        failed_urls.append(url)
+        print(f"Error fetching or processing {url}, exception: {e}")
+
+if cache.offline:
+    # Never replace the full corpus with a partial one from an incomplete cache
+    if failed_urls:
+        sys.exit(
+            f"Offline run: {len(failed_urls)} pages could not be read from the cache, "
+            f"leaving data/website_data.pkl unchanged."
+        )
+
+with open('data/website_data.pkl', 'wb') as f:
+    pickle.dump(data, f)
+
+if cache.offline:
+    print(f"Offline run: extracted {len(data)} documents from the cache, skipping upload.")
+    sys.exit(0)
 
 
 
@@ -0,0 +1,79 @@
+# This script builds one FAISS index per source category (see lib/shards.py)
+# from the documents saved by 01_scrape_urls_and_upload_to_openai_vec_store.py.
+# Each page is assigned a shard from its URL path and its page_title in
+# data/scraped_urls_revised.csv, chunked, embedded, and saved under
+# vstore/shards/<shard>/ so that app/server.py can route questions to only the
+# shards that apply. The previous shards are replaced as a whole, so a category
+# that is no longer produced does not linger on disk.
+
+import sys
+import pickle
+import shutil
+from pathlib import Path
+from collections import defaultdict
+
+import pandas as pd
+
+from dotenv import load_dotenv
+from langchain_openai import OpenAIEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from lib.shards import categorize, check_routing
+
+load_dotenv(override = True)
+
+
+# Checking that page categories and query routing agree
+# ------------------------------------------------------------------------------
+problems = check_routing()
+if problems:
+    sys.exit("Routing check failed:\n" + "\n".join(problems))
+
+
+# Documents and page titles
+# ------------------------------------------------------------------------------
+with open('data/website_data.pkl', 'rb') as f:
+    data = pickle.load(f)
+
+page_titles = (
+    pd.read_csv('data/scraped_urls_revised.csv')
+    .dropna(subset = ['url'])
+    .fillna({'page_title': ''})
+    .set_index('url')
+    ['page_title']
+    .to_dict()
+)
+
+
+# Assigning each document to a shard
+# ----------------------------------
+splitter = RecursiveCharacterTextSplitter(chunk_size = 1000, chunk_overlap = 200)
+
+shards = defaultdict(list)
+for document in data:
+    source = document.metadata.get("source", "")
+    title = page_titles.get(source) or document.metadata.get("title", "")
+    shard = categorize(source, title)
+
+    for chunk in splitter.split_documents([document]):
+        chunk.metadata["shard"] = shard
+        shards[shard].append(chunk)
+
+
+# Building and saving one index per shard
+# ------------------------------------------------------------------------------
+embeddings = OpenAIEmbeddings(model = 'text-embedding-3-small')
+
+# Built next to the live shards and swapped in once every shard is saved
+build_dir = Path('vstore/shards.build')
+shutil.rmtree(build_dir, ignore_errors = True)
+
+for shard, chunks in shards.items():
+    vectorstore = FAISS.from_documents(chunks, embeddings)
+    vectorstore.save_local(str(build_dir / shard))
+    print(f"Saved shard '{shard}': {len(chunks)} chunks")
+
+shutil.rmtree('vstore/shards', ignore_errors = True)
+build_dir.rename('vstore/shards')